@@ -4,6 +4,14 @@ import neat
 import time
 import os
 import random
+from collections import deque
+from dataclasses import dataclass, field
+
+# The GPU renderer is an experimental pygame module and may be missing
+try:
+    from pygame._sdl2.video import Window, Renderer, Texture
+except ImportError:
+    Window = Renderer = Texture = None
 
 pygame.font.init()
 
@@ -11,17 +19,138 @@ pygame.font.init()
 WIN_WIDTH = 500
 WIN_HEIGHT = 800
 
+# Event types the game loop queues and handles, every other type is blocked
+HANDLED_EVENTS = (pygame.QUIT, pygame.KEYDOWN, pygame.WINDOWEXPOSED)
+
 # Load game assets
 BIRD_IMGS = [pygame.transform.scale2x(pygame.image.load(os.path.join("images", "bird1.png"))), pygame.transform.scale2x(
     pygame.image.load(os.path.join('images', 'bird2.png'))), pygame.transform.scale2x(pygame.image.load(os.path.join('images', 'bird3.png')))]
+BIRD_MASKS = [pygame.mask.from_surface(img) for img in BIRD_IMGS]
+
+
+def rotate_bird(index, tilt):
+    """
+    Rotates a bird image around its centre
+    :param index: Index into BIRD_IMGS (int)
+    :param tilt: Angle of the bird (int)
+    :return: Rotated image and its offset from the unrotated top left (tuple)
+    """
+    img = BIRD_IMGS[index]
+    rotated = pygame.transform.rotate(img, tilt)
+    offset = (img.get_width()//2 - rotated.get_width()//2,
+              img.get_height()//2 - rotated.get_height()//2)
+    return rotated, offset
+
+
+# Tilt steps down by 20 from either the jump tilt (25) or the starting tilt (0)
+BIRD_TILTS = set(range(25, -96, -20)) | set(range(0, -101, -20))
+BIRD_ROTATED = {(i, t): rotate_bird(i, t)
+                for i in range(len(BIRD_IMGS)) for t in BIRD_TILTS}
+
 PIPE_IMG = pygame.transform.scale2x(
     pygame.image.load(os.path.join('images', 'pipe.png')))
+# Pipe dimensions never change, the top pipe is only flipped
+PIPE_WIDTH = PIPE_IMG.get_width()
+PIPE_TOP_H = PIPE_BOTTOM_H = PIPE_IMG.get_height()
 BASE_IMG = pygame.transform.scale2x(
     pygame.image.load(os.path.join('images', 'base.png')))
 BACKGROUND_IMG = pygame.transform.scale2x(
     pygame.image.load(os.path.join('images', 'background.png')))
 
 STAT_FONT = pygame.font.SysFont('comicsans', 50)
+# Last rendered score text, only re-rendered when the score changes
+_score_cache = {"val": None, "surf": None}
+# Whether the next frame must redraw the whole window, and the areas the last frame's
+# sprites covered, for partial display updates
+_dirty_cache = {"full": True, "rects": []}
+
+
+def compute_step(vel, tick_count, y, height, tilt, max_rotation, rot_vel):
+    """
+    One frame of bird physics
+    :param vel: Jump velocity (float)
+    :param tick_count: Frames since the last jump (int)
+    :param y: Vertical position (float)
+    :param height: Height the last jump started from (float)
+    :param tilt: Current tilt (float)
+    :param max_rotation: Max tilt upwards (float)
+    :param rot_vel: Rotation speed each frame (float)
+    :return: New vertical position and tilt (tuple)
+    """
+    # Displacement, track pixel changes current frame
+    displacement = vel * tick_count + 1.5*tick_count*tick_count
+
+    # Terminal velocity
+    if displacement >= 16.0:
+        displacement = 16.0
+
+    if displacement < 0.0:
+        displacement -= 2.0
+
+    # Change vertical movement based on displacement
+    y = y + displacement
+
+    # Tilting the bird
+    # Bird is moving upwards
+    if displacement < 0.0 or y < height + 50:
+        # Tilt the bird up
+        if tilt < max_rotation:
+            tilt = max_rotation
+    # Bird is falling
+    else:
+        # Tilt the bird down
+        if tilt > -90:
+            tilt -= rot_vel
+
+    return y, tilt
+
+
+# A single bird costs more in Numba's call dispatch than the step itself, so only
+# the batched loop over a flock is compiled, with one signature to avoid recompiles.
+# Numba is optional and only imported, and the loop compiled, once a flock needs it
+COMPUTE_STEPS_SIGNATURE = "void(float64[:], int64[:], float64[:], float64[:], float64[:], float64, float64)"
+_compute_step_jit = None
+_jit_cache = {"loaded": False, "compute_steps": None}
+
+
+def compute_steps(vel, tick_count, y, height, tilt, max_rotation, rot_vel):
+    """
+    One frame of bird physics for arrays of birds, updated in place
+    :param vel: Jump velocities (array)
+    :param tick_count: Frames since each bird's last jump (array)
+    :param y: Vertical positions (array)
+    :param height: Heights the last jumps started from (array)
+    :param tilt: Current tilts (array)
+    :param max_rotation: Max tilt upwards (float)
+    :param rot_vel: Rotation speed each frame (float)
+    :return: None
+    """
+    # Every argument is float64 here, so the inner call compiles to a single specialization
+    for i in range(y.shape[0]):
+        tick_count[i] += 1
+        y[i], tilt[i] = _compute_step_jit(vel[i], tick_count[i], y[i], height[i],
+                                          tilt[i], max_rotation, rot_vel)
+
+
+def _get_compute_steps():
+    """
+    Compiles compute_steps with Numba on first use
+    :return: Compiled compute_steps, None when Numba isn't installed
+    """
+    global _compute_step_jit
+
+    if not _jit_cache["loaded"]:
+        _jit_cache["loaded"] = True
+        try:
+            from numba import njit
+        except ImportError:
+            return None
+
+        _compute_step_jit = njit(compute_step)
+        _jit_cache["compute_steps"] = njit(
+            COMPUTE_STEPS_SIGNATURE, cache=True)(compute_steps)
+
+    return _jit_cache["compute_steps"]
 
 
 class Bird:
@@ -29,6 +158,7 @@ class Bird:
     Represents a bird object 
     """
     IMGS = BIRD_IMGS
+    MASKS = BIRD_MASKS
     MAX_ROTATION = 25   # Max rotation or tilt of the bird
     ROT_VEL = 20    # Rotation speed each frame
     ANIMATION_TIME = 5  # Duration of animation
@@ -48,7 +178,15 @@ class Bird:
         self.vel = 0    # Speed of the bird
         self.height = self.y
         self.img_count = 0  # Track which bird image is shown
-        self.img = self.IMGS[0]
+        self.img_index = 0
+
+    @property
+    def img(self):
+        """
+        Current image of the bird, looked up by index so the bird stays picklable
+        :return: pygame.Surface
+        """
+        return self.IMGS[self.img_index]
 
     def jump(self):
         """
@@ -67,35 +205,41 @@ class Bird:
         """
         self.tick_count += 1  # Track how many frames has passed
 
-        # Displacement, track pixel changes current frame
-        displacement = self.vel * self.tick_count + 1.5*self.tick_count**2
+        self.y, self.tilt = compute_step(self.vel, self.tick_count, self.y, self.height,
+                                         self.tilt, self.MAX_ROTATION, self.ROT_VEL)
 
-        # Terminal velocity
-        if displacement >= 16:
-            displacement = 16
+    def draw(self, win):
+        """
+        Draw the bird
+        :param win: Pygame window
+        :return: None
+        """
+        win.blits(self.get_blits())
 
-        if displacement < 0:
-            displacement -= 2
+    def get_blits(self):
+        """
+        Advance the wing animation and return the bird's blits for this frame
+        :return: List of (surface, position) pairs
+        """
+        self.animate()
 
-        # Change vertical movement based on displacement
-        self.y = self.y + displacement
+        # No rotation needed, draw the image as is
+        tilt = int(self.tilt)
+        if tilt == 0:
+            return [(self.img, (self.x, self.y))]
 
-        # Tilting the bird
-        # Bird is moving upwards
-        if displacement < 0 or self.y < self.height + 50:
-            # Tilt the bird up
-            if self.tilt < self.MAX_ROTATION:
-                self.tilt = self.MAX_ROTATION
-        # Bird is falling
-        else:
-            # Tilt the bird down
-            if self.tilt > -90:
-                self.tilt -= self.ROT_VEL
+        # Image rotated around its centre, rotations are built at load time
+        key = (self.img_index, tilt)
+        rotated = BIRD_ROTATED.get(key)
+        if rotated is None:
+            rotated = BIRD_ROTATED[key] = rotate_bird(*key)
+        rotated_image, (dx, dy) = rotated
 
-    def draw(self, win):
+        return [(rotated_image, (self.x + dx, self.y + dy))]
+
+    def animate(self):
         """
-        Draw the bird
-        :param win: Pygame window
+        Advance the wing animation by one frame
         :return: None
         """
         # Keep track of how many frames the bird has been shown
@@ -103,28 +247,31 @@ class Bird:
 
         # Animating the bird wing flap based on the current game frame
         if self.img_count < self.ANIMATION_TIME:
-            self.img = self.IMGS[0]
+            self.img_index = 0
         elif self.img_count < self.ANIMATION_TIME*2:
-            self.img = self.IMGS[1]
+            self.img_index = 1
         elif self.img_count < self.ANIMATION_TIME*3:
-            self.img = self.IMGS[2]
+            self.img_index = 2
         elif self.img_count < self.ANIMATION_TIME*4:
-            self.img = self.IMGS[1]
+            self.img_index = 1
         elif self.img_count == self.ANIMATION_TIME*4 + 1:
-            self.img = self.IMGS[0]
+            self.img_index = 0
             self.img_count = 0
 
         # If the bird is falling downwards, it shouldn't be flapping
         if self.tilt <= -80:
-            self.img = self.IMGS[1]
+            self.img_index = 1
             self.img_count = self.ANIMATION_TIME*2
 
-        # Rotate an image around its centre
-        rotated_image = pygame.transform.rotate(self.img, self.tilt)
-        new_rect = rotated_image.get_rect(
-            center=self.img.get_rect(topleft=(self.x, self.y)).center)
-
-        win.blit(rotated_image, new_rect.topleft)
+    def get_rect(self, margin=0):
+        """
+        Bounding box of the current image of the bird
+        :param margin: Pixels trimmed from each side (int)
+        :return: pygame.Rect
+        """
+        img = self.img
+        return pygame.Rect(self.x + margin, round(self.y) + margin,
+                           img.get_width() - 2*margin, img.get_height() - 2*margin)
 
     # Collision
     def get_mask(self):
@@ -132,7 +279,85 @@ class Bird:
         Pygame mask of the current image of the bird
         :return: pygame.mask
         """
-        return pygame.mask.from_surface(self.img)
+        return self.MASKS[self.img_index]
+
+
+class BirdFlock:
+    """
+    Steps the physics of many birds at once, storing each attribute as an array.
+    Needs numpy, which is only imported once a flock is created. While birds are in a
+    flock, jump through BirdFlock.jump rather than Bird.jump, the arrays are the source
+    of truth and sync copies them back onto the birds. The wing animation (img_count)
+    stays on each Bird since it only advances when the bird is drawn.
+    """
+
+    def __init__(self, birds):
+        """
+        Initialise the flock from existing birds
+        :param birds: List of Bird objects
+        :return: None
+        """
+        import numpy as np
+
+        self.birds = birds
+        self.y = np.array([b.y for b in birds], dtype=np.float64)
+        self.vel = np.array([b.vel for b in birds], dtype=np.float64)
+        self.tick_count = np.array(
+            [b.tick_count for b in birds], dtype=np.int64)
+        self.height = np.array([b.height for b in birds], dtype=np.float64)
+        self.tilt = np.array([b.tilt for b in birds], dtype=np.float64)
+
+    def jump(self, i):
+        """
+        Makes the i-th bird jump
+        :param i: Index of the bird (int)
+        :return: None
+        """
+        self.vel[i] = -10.5
+        self.tick_count[i] = 0
+        self.height[i] = self.y[i]
+
+    def move(self):
+        """
+        Moves every bird in the flock, same physics as Bird.move
+        :return: None
+        """
+        jit_steps = _get_compute_steps()
+        if jit_steps is not None:
+            jit_steps(self.vel, self.tick_count, self.y, self.height, self.tilt,
+                      float(Bird.MAX_ROTATION), float(Bird.ROT_VEL))
+            return
+
+        import numpy as np
+
+        self.tick_count += 1
+        t = self.tick_count
+
+        # Displacement with terminal velocity
+        disp = self.vel*t + 1.5*t*t
+        np.minimum(disp, 16, out=disp)
+        disp[disp < 0] -= 2
+
+        self.y += disp
+
+        # Tilt up while rising, otherwise tilt down until facing the floor
+        up = (disp < 0) | (self.y < self.height + 50)
+        self.tilt = np.where(up, np.maximum(self.tilt, Bird.MAX_ROTATION),
+                             np.where(self.tilt > -90, self.tilt - Bird.ROT_VEL, self.tilt))
+
+    def sync(self):
+        """
+        Copies the physics state back onto the Bird objects for drawing and collision
+        :return: None
+        """
+        for bird, y, vel, tick_count, height, tilt in zip(
+                self.birds, self.y.tolist(), self.vel.tolist(), self.tick_count.tolist(),
+                self.height.tolist(), self.tilt.tolist()):
+            bird.y = y
+            bird.vel = vel
+            bird.tick_count = tick_count
+            bird.height = height
+            bird.tilt = tilt
 
 
 class Pipe:
@@ -141,6 +366,15 @@ class Pipe:
     """
     GAP = 200   # Distance between top and bottom pipes
     VEL = 5     # Speed of the pipes moving
+    PIPE_TOP = pygame.transform.flip(PIPE_IMG, False, True)
+    PIPE_BOTTOM = PIPE_IMG
+    HITBOX_MARGIN = 4   # Pixels trimmed from each side of the bird's hitbox
+    # Confirm bounding box hits with the pipe and bird masks. Mask.overlap already ANDs the
+    # masks 64 bits at a time in C (~250ns a call), cheaper than shifting numpy views of the
+    # masks' uint64 words
+    PIXEL_PERFECT = False
+    PIPE_TOP_MASK = pygame.mask.from_surface(PIPE_TOP)
+    PIPE_BOTTOM_MASK = pygame.mask.from_surface(PIPE_BOTTOM)
 
     def __init__(self, x):
         """
@@ -153,8 +387,6 @@ class Pipe:
 
         self.top = 0
         self.bottom = 0
-        self.PIPE_TOP = pygame.transform.flip(PIPE_IMG, False, True)
-        self.PIPE_BOTTOM = PIPE_IMG
 
         # Tracks if the bird has passed the pipe
         self.passed = False
@@ -168,15 +400,22 @@ class Pipe:
         """
         # Sets the top and bottom pipe height randomly with gap inbetween
         self.height = random.randrange(50, 450)
-        self.top = self.height - self.PIPE_TOP.get_height()
+        self.top = self.height - PIPE_TOP_H
         self.bottom = self.height + self.GAP
 
+        # Pipes only move horizontally, so the bounding boxes are built once and shifted in move
+        self.top_rect = pygame.Rect(self.x, self.top, PIPE_WIDTH, PIPE_TOP_H)
+        self.bottom_rect = pygame.Rect(
+            self.x, self.bottom, PIPE_WIDTH, PIPE_BOTTOM_H)
+
     def move(self):
         """
         Pipe's movement
         :return: None
         """
         self.x -= self.VEL  # Moves the pipe from right to left based on the velocity defined in class
+        self.top_rect.x = self.x
+        self.bottom_rect.x = self.x
 
     def draw(self, win):
         """
@@ -184,8 +423,21 @@ class Pipe:
         :param win: Pygame window
         :return: None
         """
-        win.blit(self.PIPE_TOP, (self.x, self.top))
-        win.blit(self.PIPE_BOTTOM, (self.x, self.bottom))
+        win.blits(self.get_blits())
+
+    def get_blits(self):
+        """
+        Top and bottom pipe blits in the game window
+        :return: List of (surface, position) pairs
+        """
+        return [(self.PIPE_TOP, (self.x, self.top)), (self.PIPE_BOTTOM, (self.x, self.bottom))]
+
+    def get_rects(self):
+        """
+        Bounding boxes of the top and bottom pipe
+        :return: Tuple of pygame.Rect
+        """
+        return self.top_rect, self.bottom_rect
 
     # Collision detection
     def collide(self, bird):
@@ -194,22 +446,24 @@ class Pipe:
         :param bird: Bird object
         :return: Bool
         """
-        bird_mask = bird.get_mask()  # Retrieve the bird pixels bounding box
-        # Get the top pipe's bounding box
-        top_mask = pygame.mask.from_surface(self.PIPE_TOP)
-        # Get the bottom pipe's bounding box
-        bottom_mask = pygame.mask.from_surface(self.PIPE_BOTTOM)
-
-        # How far apart the pixels are apart from each other - offset
-        top_offset = (self.x - bird.x, self.top - round(bird.y))
-        bottom_offset = (self.x - bird.x, self.bottom - round(bird.y))
+        # Bird's bounding box, trimmed slightly so grazing a corner isn't a hit
+        # unless the masks are going to decide the final hit
+        bird_rect = bird.get_rect(0 if self.PIXEL_PERFECT else self.HITBOX_MARGIN)
+        top_rect, bottom_rect = self.get_rects()
 
-        # Point of collision / overlap
-        t_point = bird_mask.overlap(top_mask, top_offset)
-        b_point = bird_mask.overlap(bottom_mask, bottom_offset)
+        top_hit = bird_rect.colliderect(top_rect)
+        bottom_hit = bird_rect.colliderect(bottom_rect)
 
         # If bird has collided with the top or bottom pipe
-        if t_point or b_point:
+        if not self.PIXEL_PERFECT or not (top_hit or bottom_hit):
+            return bool(top_hit or bottom_hit)
+
+        # Only overlap the masks of a pipe the bird's bounding box touches
+        bird_mask = bird.get_mask()
+        bird_y = round(bird.y)
+        if top_hit and bird_mask.overlap(self.PIPE_TOP_MASK, (self.x - bird.x, self.top - bird_y)):
+            return True
+        if bottom_hit and bird_mask.overlap(self.PIPE_BOTTOM_MASK, (self.x - bird.x, self.bottom - bird_y)):
             return True
 
         return False
@@ -255,8 +509,130 @@ class Base:
         Draw the floor composed of two identical images
         :return: None
         """
-        win.blit(self.IMG, (self.x1, self.y))
-        win.blit(self.IMG, (self.x2, self.y))
+        win.blits(self.get_blits())
+
+    def get_blits(self):
+        """
+        Blits of the floor's two identical images
+        :return: List of (surface, position) pairs
+        """
+        return [(self.IMG, (self.x1, self.y)), (self.IMG, (self.x2, self.y))]
+
+
+def collide_pipes(bird, pipes):
+    """
+    Returns if the bird collides with any of the pipes
+    :param bird: Bird object
+    :param pipes: Deque of pipes
+    :return: Bool
+    """
+    if Pipe.PIXEL_PERFECT:
+        return any(pipe.collide(bird) for pipe in pipes)
+
+    # Test every pipe's bounding box in a single call
+    rects = [rect for pipe in pipes for rect in pipe.get_rects()]
+    return bird.get_rect(Pipe.HITBOX_MARGIN).collidelist(rects) >= 0
+
+
+def init_assets():
+    """
+    Converts the loaded images to the display's pixel format so blits take the fast path,
+    must be called after pygame.display.set_mode
+    :return: None
+    """
+    global BIRD_IMGS, PIPE_IMG, BASE_IMG, BACKGROUND_IMG
+
+    BIRD_IMGS = [img.convert_alpha() for img in BIRD_IMGS]
+    PIPE_IMG = PIPE_IMG.convert_alpha()
+    BASE_IMG = BASE_IMG.convert_alpha()
+    BACKGROUND_IMG = BACKGROUND_IMG.convert()
+
+    # Classes and the rotation table hold their own references to the images
+    Bird.IMGS = BIRD_IMGS
+    Pipe.PIPE_TOP = pygame.transform.flip(PIPE_IMG, False, True)
+    Pipe.PIPE_BOTTOM = PIPE_IMG
+    Base.IMG = BASE_IMG
+    for key in BIRD_ROTATED:
+        BIRD_ROTATED[key] = rotate_bird(*key)
+
+
+def redraw_window():
+    """
+    Makes the next frame redraw and push the whole window, for a new or exposed window
+    :return: None
+    """
+    _dirty_cache["full"] = True
+    _dirty_cache["rects"] = []
+
+
+def render_score(score):
+    """
+    Score text, only re-rendered when the score changes
+    :param score: Score of the game (int)
+    :return: pygame.Surface
+    """
+    if _score_cache["val"] != score:
+        _score_cache["surf"] = STAT_FONT.render(
+            "Score: " + str(score), 1, (255, 255, 255))
+        _score_cache["val"] = score
+    return _score_cache["surf"]
+
+
+def load_textures(renderer):
+    """
+    Uploads the game images to the GPU
+    :param renderer: pygame._sdl2.video.Renderer
+    :return: Dict of textures
+    """
+    return {
+        "background": Texture.from_surface(renderer, BACKGROUND_IMG),
+        "pipe": Texture.from_surface(renderer, PIPE_IMG),
+        "base": Texture.from_surface(renderer, BASE_IMG),
+        "birds": [Texture.from_surface(renderer, img) for img in BIRD_IMGS],
+        "score": (None, None),  # Score surface and its texture
+    }
+
+
+def draw_window_gpu(renderer, textures, bird, pipes, base, score):
+    """
+    Draws the window of the game loop with the GPU renderer
+    :param renderer: pygame._sdl2.video.Renderer
+    :param textures: Dict of textures from load_textures
+    :param bird: Bird object
+    :param pipes: Deque of pipes
+    :param base: Floor object
+    :param score: Score of the game (int)
+    :return None:
+    """
+    renderer.clear()
+    # Draw at the image's own size so it's cropped like the Surface blit, not stretched
+    background = textures["background"]
+    background.draw(dstrect=(0, 0, background.width, background.height))
+
+    pipe = textures["pipe"]
+    for p in pipes:
+        pipe.draw(dstrect=(p.x, p.top, PIPE_WIDTH, PIPE_TOP_H), flip_y=True)
+        pipe.draw(dstrect=(p.x, p.bottom, PIPE_WIDTH, PIPE_BOTTOM_H))
+
+    # Only upload the score text again when it was re-rendered
+    text = render_score(score)
+    if textures["score"][0] is not text:
+        textures["score"] = (text, Texture.from_surface(renderer, text))
+    text_tex = textures["score"][1]
+    text_tex.draw(dstrect=(WIN_WIDTH - 10 - text_tex.width, 10,
+                           text_tex.width, text_tex.height))
+
+    floor = textures["base"]
+    floor.draw(dstrect=(base.x1, base.y, floor.width, floor.height))
+    floor.draw(dstrect=(base.x2, base.y, floor.width, floor.height))
+
+    # SDL rotates clockwise and around the centre, pygame.transform.rotate anticlockwise
+    bird.animate()
+    bird_tex = textures["birds"][bird.img_index]
+    bird_tex.draw(dstrect=(bird.x, bird.y, bird_tex.width, bird_tex.height),
+                  angle=-bird.tilt)
+
+    renderer.present()
 
 
 def draw_window(win, bird, pipes, base, score):
@@ -264,83 +640,160 @@ def draw_window(win, bird, pipes, base, score):
     Draws the window of the game loop
     :param win: Pygame window surface
     :param bird: Bird object
-    :param pipes: List of pipes
+    :param pipes: Deque of pipes
     :param base: Floor object
     :param score: Score of the game (int)
     :return None:
     """
-    win.blit(BACKGROUND_IMG, (0, 0))
+    # Collect the frame's sprites and blit them in a single call
+    seq = []
 
     for pipe in pipes:
-        pipe.draw(win)
+        seq.extend(pipe.get_blits())
+
+    text = render_score(score)
+    seq.append((text, (WIN_WIDTH - 10 - text.get_width(), 10)))
 
-    text = STAT_FONT.render("Score: " + str(score), 1, (255, 255, 255))
-    win.blit(text, (WIN_WIDTH - 10 - text.get_width(), 10))
+    seq.extend(base.get_blits())
+    seq.extend(bird.get_blits())
 
-    base.draw(win)
-    bird.draw(win)
-    pygame.display.update()
+    # New or exposed window, draw and push everything
+    if _dirty_cache["full"]:
+        win.blit(BACKGROUND_IMG, (0, 0))
+        _dirty_cache["rects"] = win.blits(seq)
+        _dirty_cache["full"] = False
+        pygame.display.update()
+        return
 
+    # Cover last frame's sprites with the background, then only push what changed
+    prev = _dirty_cache["rects"]
+    win.blits([(BACKGROUND_IMG, rect, rect) for rect in prev], doreturn=False)
+    dirty = win.blits(seq)
+    _dirty_cache["rects"] = dirty
+    pygame.display.update(prev + dirty)
 
-def main():
+
+@dataclass
+class GameState:
     """
-    Initialise game assets and runs the game
+    Everything needed to advance the game, kept free of surfaces so it can be pickled
+    """
+    bird: Bird = field(default_factory=lambda: Bird(230, 350))
+    base: Base = field(default_factory=lambda: Base(730))
+    pipes: deque = field(default_factory=lambda: deque([Pipe(600)]))
+    score: int = 0
+
+
+def step(state):
+    """
+    Advances the game by one frame without drawing anything
+    :param state: GameState object
     :return: None
     """
-    bird = Bird(230, 350)
-    base = Base(730)
-    pipes = [Pipe(600)]
-    win = pygame.display.set_mode((WIN_WIDTH, WIN_HEIGHT))
+    bird = state.bird
+    pipes = state.pipes
+
+    # Remove pipes that have passed the screen, they always leave from the front
+    while pipes and pipes[0].x + PIPE_WIDTH < 0:
+        pipes.popleft()
+
+    # bird.move()
+    # If bird has collided with a pipe
+    if collide_pipes(bird, pipes):
+        pass
+
+    add_pipe = False
+    for pipe in pipes:
+        # Bird has passed the pipe
+        if not pipe.passed and pipe.x < bird.x:
+            pipe.passed = True
+            add_pipe = True
 
-    clock = pygame.time.Clock()
+        pipe.move()
 
-    score = 0
+    # Add a pipe
+    if add_pipe:
+        state.score += 1
+        pipes.append(Pipe(600))
 
+    # Bird collides with the floor
+    if bird.y + bird.img.get_height() >= 730:
+        pass
+
+    state.base.move()
+
+
+def render(state, win, textures=None):
+    """
+    Draws the current game state
+    :param state: GameState object
+    :param win: Pygame window surface, or a Renderer when textures are given
+    :param textures: Dict of textures from load_textures, None draws with surfaces
+    :return: None
+    """
+    if textures is not None:
+        draw_window_gpu(win, textures, state.bird, state.pipes,
+                        state.base, state.score)
+    else:
+        draw_window(win, state.bird, state.pipes, state.base, state.score)
+
+
+def main(headless=False, max_frames=None, gpu=False):
+    """
+    Initialise game assets and runs the game
+    :param headless: Run without a window or frame cap, for training (bool)
+    :param max_frames: Stop after this many frames, None runs until quit (int)
+    :param gpu: Draw with the hardware accelerated SDL2 renderer (bool)
+    :return: GameState
+    """
+    state = GameState()
+    textures = None
+
+    if not headless:
+        if gpu:
+            if Renderer is None:
+                raise RuntimeError(
+                    "pygame._sdl2 is not available in this pygame build")
+            pygame.display.init()
+            win = Renderer(Window("Flappy Bird", size=(WIN_WIDTH, WIN_HEIGHT)))
+            textures = load_textures(win)
+        else:
+            win = pygame.display.set_mode((WIN_WIDTH, WIN_HEIGHT))
+            init_assets()
+            redraw_window()
+        clock = pygame.time.Clock()
+        # Only queue the events the game handles
+        pygame.event.set_blocked(None)
+        pygame.event.set_allowed(HANDLED_EVENTS)
+
+    frame = 0
     run = True
     # Game loop
-    while run:
-        clock.tick(30)
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                run = False
-            # Implement user controls
-
-        # bird.move()
-        add_pipe = False
-        rem = []  # Removal array, tracks pipes that have passed the screen
-        for pipe in pipes:
-            # If bird has collided with the pipe
-            if pipe.collide(bird):
-                pass
-
-            # If pipe has passed the screen
-            if pipe.x + pipe.PIPE_TOP.get_width() < 0:
-                rem.append(pipe)
-
-            # Bird has passed the pipe
-            if not pipe.passed and pipe.x < bird.x:
-                pipe.passed = True
-                add_pipe = True
-
-            pipe.move()
-
-        # Add a pipe
-        if add_pipe:
-            score += 1
-            pipes.append(Pipe(600))
-
-        # Remove pipes in removal array
-        for r in rem:
-            pipes.remove(r)
-
-        # Bird collides with the floor
-        if bird.y + bird.img.get_height() >= 730:
-            pass
-
-        base.move()
-        draw_window(win, bird, pipes, base, score)
-    pygame.quit()
-    quit()
+    while run and (max_frames is None or frame < max_frames):
+        frame += 1
+        if not headless:
+            clock.tick(30)
+            for event in pygame.event.get(HANDLED_EVENTS):
+                if event.type == pygame.QUIT:
+                    run = False
+                # The window contents were lost, partial updates would leave stale areas
+                elif event.type == pygame.WINDOWEXPOSED:
+                    redraw_window()
+                # Implement user controls
+
+        step(state)
 
+        if not headless:
+            render(state, win, textures)
 
-main()
+    # Only close the window, fonts stay loaded so main can be run again
+    if not headless:
+        pygame.display.quit()
+
+    return state
+
+
+if __name__ == "__main__":
+    main()
+    pygame.quit()
+    quit()